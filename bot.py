@@ -3,122 +3,307 @@ Advanced Telegram Bot for Audio Effects
 Multiple effects, progress tracking, and queue system
 """
 import os
+import time
 import logging
 import asyncio
+import tempfile
+from shutil import which
 from datetime import datetime
-from collections import deque
+from functools import lru_cache
+from fractions import Fraction
+from collections import deque, defaultdict, OrderedDict
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, 
     CallbackQueryHandler, filters, ContextTypes
 )
 from pydub import AudioSegment
-from pydub.effects import low_pass_filter, high_pass_filter, compress_dynamic_range
-from pydub.playback import _play_with_simpleaudio
+from pydub.effects import compress_dynamic_range
+import numpy as np
+from scipy.signal import butter, sosfilt, resample_poly, oaconvolve
 
-# Setup logging
+try:
+    from numba import njit
+except ImportError:  # numba is optional; nightmare falls back to chained effects
+    njit = None
+
+# Setup logging: drop asctime from the format (strftime per record adds up
+# under load) and quiet the libraries that log every API request at INFO
 logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
+for _name in ('httpx', 'telegram', 'asyncio'):
+    logging.getLogger(_name).setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 # Configuration
 BOT_TOKEN = os.getenv("BOT_TOKEN", "8178596130:AAFttDeuEkHSFzpBzVg9zTwQbGX4Il0O5zM")
-TEMP_DIR = "temp"
+# Keep scratch files on the tmpfs RAM disk when the host has one
+TEMP_DIR = os.path.join("/dev/shm", "audio_bot") if os.path.isdir("/dev/shm") else "temp"
 MAX_QUEUE_SIZE = 10
 
 # Create temp directory
 os.makedirs(TEMP_DIR, exist_ok=True)
 
-# Queue system
+# Resolve the ffmpeg binaries once so pydub skips per-call which() lookups
+# (pydub 0.25.1 has no AudioSegment.ffprobe class attribute, so fall back
+# to the bare command name rather than reading the attribute)
+AudioSegment.converter = which('ffmpeg') or AudioSegment.converter
+AudioSegment.ffprobe = which('ffprobe') or getattr(AudioSegment, 'ffprobe', 'ffprobe')
+
+# Queue system: uploads wait in per-user deques until an effect is chosen,
+# then flow through one bounded global queue drained by a fixed worker pool
 user_queues = {}
-processing_users = set()
+WORKER_COUNT = os.cpu_count() or 2
+WORK_QUEUE_SIZE = 256
+work_queue = None  # created by _start_workers once the event loop runs
+user_locks = defaultdict(asyncio.Lock)
+
+# Decoded-audio cache: file_unique_id -> (samples, frame_rate, channels, sample_width)
+# Skips the ffmpeg decode when the same upload is processed again. Decoded
+# PCM is roughly 10x the compressed upload (a 20MB MP3 is ~200MB of
+# samples), so the cache is bounded by total bytes rather than entry count.
+SAMPLES_CACHE_BYTES = 256 * 1024 * 1024
+_samples_cache = OrderedDict()
+_samples_cache_used = 0
+
+
+def _samples_cache_get(unique_id):
+    """Return a cached decode result and mark it most recently used"""
+    entry = _samples_cache.get(unique_id)
+    if entry is not None:
+        _samples_cache.move_to_end(unique_id)
+    return entry
+
+
+def _samples_cache_put(unique_id, entry):
+    """Store a decode result, evicting least recently used past the budget"""
+    global _samples_cache_used
+    # Concurrent misses can decode the same upload twice; don't count the
+    # overwritten entry's bytes forever
+    previous = _samples_cache.get(unique_id)
+    if previous is not None:
+        _samples_cache_used -= previous[0].nbytes
+    _samples_cache[unique_id] = entry
+    _samples_cache_used += entry[0].nbytes
+    while _samples_cache_used > SAMPLES_CACHE_BYTES and len(_samples_cache) > 1:
+        _, evicted = _samples_cache.popitem(last=False)
+        _samples_cache_used -= evicted[0].nbytes
+
+
+class AudioBuf:
+    """Decoded audio as float32 samples in [-1, 1), shape (frames, channels)"""
+    __slots__ = ('samples', 'frame_rate')
+
+    def __init__(self, samples, frame_rate):
+        self.samples = samples
+        self.frame_rate = frame_rate
+
+    @property
+    def channels(self):
+        return self.samples.shape[1] if self.samples.ndim == 2 else 1
+
+
+def _gain(db):
+    """dB -> linear amplitude factor"""
+    return 10.0 ** (db / 20.0)
+
+
+def _to_buf(audio):
+    """The one int16 -> float32 cast at the start of an effect pipeline"""
+    samples = np.frombuffer(audio.raw_data, dtype=np.int16)
+    if audio.channels > 1:
+        samples = samples.reshape(-1, audio.channels)
+    return AudioBuf(samples.astype(np.float32) * (1.0 / 32768.0), audio.frame_rate)
+
+
+def _from_buf(buf):
+    """The one float32 -> clip -> int16 cast at the end of an effect pipeline"""
+    samples = np.clip(buf.samples * 32768.0, -32768, 32767).astype(np.int16)
+    return AudioSegment(
+        data=samples.tobytes(),
+        sample_width=2,
+        frame_rate=buf.frame_rate,
+        channels=buf.channels,
+    )
+
+
+# Reverb tap schedule: delays in ms plus linear gains, computed once at
+# import instead of re-deriving the dB -> amplitude factor per call
+_REVERB_DELAYS = (50, 100, 150, 200, 250)
+_REVERB_DECAYS = (0.3, 0.25, 0.2, 0.15, 0.1)
+_REVERB_GAINS = tuple(_gain(-20.0 / decay) for decay in _REVERB_DECAYS)
+
+
+@lru_cache(maxsize=8)
+def _build_reverb_ir(frame_rate):
+    """Sparse impulse response: the dry tap plus the five decayed echoes"""
+    h = np.zeros(int(_REVERB_DELAYS[-1] * frame_rate / 1000) + 1, dtype=np.float32)
+    h[0] = 1.0
+    for delay, gain in zip(_REVERB_DELAYS, _REVERB_GAINS):
+        h[int(delay * frame_rate / 1000)] += gain
+    return h
+
+
+@lru_cache(maxsize=None)
+def _design_sos(frame_rate, cutoff, btype):
+    """Design a 4th-order Butterworth filter once per (rate, cutoff, type)"""
+    return butter(4, cutoff, btype, fs=frame_rate, output='sos')
+
+
+@lru_cache(maxsize=64)
+def _resample_fraction(rate_ratio):
+    """Reduce a resample ratio to small integer up/down factors once"""
+    ratio = Fraction(rate_ratio).limit_denominator(1000)
+    return ratio.numerator, ratio.denominator
+
+
+def _nightmare_kernel(samples, frame_rate, channels):
+    """Fused pitch-down + slow-down + reverb pass over one float32 buffer"""
+    # Combined resample ratio: 0.7x speed on top of a -5 semitone shift
+    ratio = 0.7 * 2.0 ** (-5.0 / 12.0)
+    frames = samples.shape[0] // channels
+    out_frames = int(frames / ratio)
+    out = np.zeros(out_frames * channels, dtype=np.float32)
+
+    # Linear-interpolation resample at the combined ratio
+    for i in range(out_frames):
+        pos = i * ratio
+        i0 = int(pos)
+        frac = pos - i0
+        i1 = i0 + 1
+        if i1 >= frames:
+            i1 = frames - 1
+        for c in range(channels):
+            a = samples[i0 * channels + c]
+            b = samples[i1 * channels + c]
+            out[i * channels + c] = a + (b - a) * frac
+
+    # 5-tap comb reverb added in place over the resampled buffer
+    delays = (50, 100, 150, 200, 250)
+    decays = (0.3, 0.25, 0.2, 0.15, 0.1)
+    dry = out.copy()
+    for t in range(5):
+        offset = (delays[t] * frame_rate // 1000) * channels
+        gain = 10.0 ** (-(20.0 / decays[t]) / 20.0)
+        for j in range(offset, out.shape[0]):
+            out[j] += dry[j - offset] * gain
+
+    # Final -3 dB trim (clipping happens once at the int16 export boundary)
+    trim = 10.0 ** (-3.0 / 20.0)
+    for j in range(out.shape[0]):
+        out[j] *= trim
+    return out
+
+
+if njit is not None:
+    _nightmare_kernel = njit(cache=True, fastmath=True)(_nightmare_kernel)
 
 
 class AudioEffects:
-    """Collection of audio effects"""
-    
+    """Collection of audio effects (all take and return an AudioBuf)"""
+
+    @staticmethod
+    def _apply_sos(buf, sos):
+        """Run a cascaded-sections filter over the samples (vectorized)"""
+        y = sosfilt(sos, buf.samples, axis=0).astype(np.float32)
+        return AudioBuf(y, buf.frame_rate)
+
     @staticmethod
-    def muffled(audio, intensity="medium"):
+    def muffled(buf, intensity="medium"):
         """Make audio sound muffled (through a wall)"""
         cutoffs = {"light": 1500, "medium": 800, "heavy": 400}
         cutoff = cutoffs.get(intensity, 800)
-        muffled = low_pass_filter(audio, cutoff)
-        return muffled - 3  # Reduce volume slightly
-    
+        muffled = AudioEffects._apply_sos(
+            buf, _design_sos(buf.frame_rate, cutoff, 'lowpass')
+        )
+        muffled.samples *= _gain(-3)  # Reduce volume slightly
+        return muffled
+
     @staticmethod
-    def underwater(audio):
+    def underwater(buf):
         """Underwater effect with bubbling sound"""
         # Heavy low-pass + volume modulation
-        underwater = low_pass_filter(audio, 300)
-        underwater = underwater - 6  # Quieter
+        underwater = AudioEffects._apply_sos(
+            buf, _design_sos(buf.frame_rate, 300, 'lowpass')
+        )
+        underwater.samples *= _gain(-6)  # Quieter
         # Add slight wobble (frequency modulation simulation)
         return underwater
-    
+
     @staticmethod
-    def phone(audio):
+    def phone(buf):
         """Old telephone/radio effect"""
         # Bandpass filter (remove low and high frequencies)
-        phone = high_pass_filter(audio, 300)
-        phone = low_pass_filter(phone, 3000)
-        # Add compression
-        phone = compress_dynamic_range(phone)
-        return phone - 2
+        phone = AudioEffects._apply_sos(
+            buf, _design_sos(buf.frame_rate, 300, 'highpass')
+        )
+        phone = AudioEffects._apply_sos(
+            phone, _design_sos(buf.frame_rate, 3000, 'lowpass')
+        )
+        # Add compression (pydub-based, so round-trip at that boundary)
+        phone = _to_buf(compress_dynamic_range(_from_buf(phone)))
+        phone.samples *= _gain(-2)
+        return phone
     
     @staticmethod
-    def echo(audio, delay_ms=300, decay=0.5):
+    def echo(buf, delay_ms=300, decay=0.5):
         """Add echo effect"""
-        # Create delayed copy
-        silence = AudioSegment.silent(duration=delay_ms)
-        delayed = silence + audio
-        # Mix with original
-        echo_audio = audio.overlay(delayed - (20 * (1 - decay)))
-        return echo_audio
-    
+        samples = buf.samples
+        out = samples.copy()
+
+        # Mix a delayed, attenuated copy back in (vectorized, no overlay)
+        offset = int(delay_ms * buf.frame_rate / 1000)
+        if offset < len(samples):
+            out[offset:] += samples[:len(samples) - offset] * _gain(-20 * (1 - decay))
+
+        return AudioBuf(out, buf.frame_rate)
+
     @staticmethod
-    def reverb(audio):
-        """Simple reverb effect using multiple echoes"""
-        reverb_audio = audio
-        delays = [50, 100, 150, 200, 250]
-        decays = [0.3, 0.25, 0.2, 0.15, 0.1]
-        
-        for delay, decay in zip(delays, decays):
-            silence = AudioSegment.silent(duration=delay)
-            delayed = silence + audio
-            reverb_audio = reverb_audio.overlay(delayed - (20 / decay))
-        
-        return reverb_audio
+    def reverb(buf):
+        """Reverb as one FFT convolution with the cached impulse response"""
+        h = _build_reverb_ir(buf.frame_rate)
+        if buf.samples.ndim == 2:
+            h = h[:, np.newaxis]
+        y = oaconvolve(buf.samples, h, mode='full', axes=0)[:len(buf.samples)]
+        return AudioBuf(y.astype(np.float32), buf.frame_rate)
     
     @staticmethod
-    def speed_change(audio, speed=1.5):
+    def _resample(buf, rate_ratio):
+        """Resample as if recorded at frame_rate * rate_ratio (polyphase FIR)"""
+        up, down = _resample_fraction(rate_ratio)
+        # Snapping back to the original rate inverts the ratio
+        y = resample_poly(buf.samples, down, up, axis=0).astype(np.float32)
+        return AudioBuf(y, buf.frame_rate)
+
+    @staticmethod
+    def speed_change(buf, speed=1.5):
         """Change playback speed"""
-        # Change frame rate to alter speed
-        sound_with_altered_frame_rate = audio._spawn(
-            audio.raw_data, 
-            overrides={"frame_rate": int(audio.frame_rate * speed)}
-        )
-        return sound_with_altered_frame_rate.set_frame_rate(audio.frame_rate)
-    
+        return AudioEffects._resample(buf, speed)
+
     @staticmethod
-    def pitch_shift(audio, semitones=2):
+    def pitch_shift(buf, semitones=2):
         """Shift pitch up or down"""
-        # Change pitch by altering sample rate
-        new_sample_rate = int(audio.frame_rate * (2.0 ** (semitones / 12.0)))
-        pitched = audio._spawn(
-            audio.raw_data,
-            overrides={'frame_rate': new_sample_rate}
-        )
-        return pitched.set_frame_rate(audio.frame_rate)
+        return AudioEffects._resample(buf, 2.0 ** (semitones / 12.0))
     
     @staticmethod
-    def nightmare(audio):
+    def nightmare(buf):
         """Creepy nightmare effect"""
-        # Combine: pitch down + reverb + slow down
-        nightmare = AudioEffects.pitch_shift(audio, -5)
-        nightmare = AudioEffects.speed_change(nightmare, 0.7)
-        nightmare = AudioEffects.reverb(nightmare)
-        return nightmare - 3
+        if njit is None:
+            # Combine: pitch down + reverb + slow down
+            nightmare = AudioEffects.pitch_shift(buf, -5)
+            nightmare = AudioEffects.speed_change(nightmare, 0.7)
+            nightmare = AudioEffects.reverb(nightmare)
+            nightmare.samples *= _gain(-3)
+            return nightmare
+
+        # One jitted pass: resample, reverb and trim in a single buffer
+        channels = buf.channels
+        out = _nightmare_kernel(buf.samples.reshape(-1), buf.frame_rate, channels)
+        if channels > 1:
+            out = out.reshape(-1, channels)
+        return AudioBuf(out, buf.frame_rate)
 
 
 # Effect presets
@@ -137,25 +322,30 @@ EFFECTS = {
     "nightmare": {"name": "👻 Nightmare Mode", "func": AudioEffects.nightmare},
 }
 
+# Pre-bake the per-effect strings used on every send, once at import
+for _effect_id, _effect_data in EFFECTS.items():
+    _effect_data['caption'] = f"✅ Effect applied: {_effect_data['name']} 🎵"
+    _effect_data['suffix'] = f"_{_effect_id}.mp3"
+
+
+# Dispatch table: callback_data carries the index into this tuple ("e0".."e11"),
+# so the handler does one int() parse and a tuple lookup per button press
+EFFECTS_BY_IDX = tuple(EFFECTS.items())
+
+# The keyboard is a pure function of EFFECTS, so build it once at import
+# (rows of 2 buttons each) and hand out the same immutable markup object
+EFFECTS_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton(EFFECTS_BY_IDX[idx][1]["name"], callback_data=f"e{idx}")
+        for idx in range(i, min(i + 2, len(EFFECTS_BY_IDX)))
+    ]
+    for i in range(0, len(EFFECTS_BY_IDX), 2)
+])
+
 
 def get_effects_keyboard():
-    """Create inline keyboard for effect selection"""
-    keyboard = []
-    effects_list = list(EFFECTS.items())
-    
-    # Create rows of 2 buttons each
-    for i in range(0, len(effects_list), 2):
-        row = []
-        for j in range(2):
-            if i + j < len(effects_list):
-                effect_id, effect_data = effects_list[i + j]
-                row.append(InlineKeyboardButton(
-                    effect_data["name"], 
-                    callback_data=f"effect_{effect_id}"
-                ))
-        keyboard.append(row)
-    
-    return InlineKeyboardMarkup(keyboard)
+    """Return the prebuilt inline keyboard for effect selection"""
+    return EFFECTS_KEYBOARD
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -217,7 +407,7 @@ async def queue_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     queue_size = len(user_queues[user_id])
-    is_processing = user_id in processing_users
+    is_processing = user_locks[user_id].locked()
     
     status = "🔄 *Processing*" if is_processing else "⏸️ *Waiting*"
     message = (
@@ -265,6 +455,7 @@ async def handle_audio(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Add to queue
         queue_item = {
             'file': file,
+            'is_voice': update.message.voice is not None,
             'message_id': update.message.message_id,
             'chat_id': update.effective_chat.id,
             'timestamp': datetime.now()
@@ -293,9 +484,9 @@ async def handle_effect_selection(update: Update, context: ContextTypes.DEFAULT_
     await query.answer()
     
     user_id = update.effective_user.id
-    effect_id = query.data.replace("effect_", "")
-    
-    if effect_id not in EFFECTS:
+    try:
+        effect_id, effect_data = EFFECTS_BY_IDX[int(query.data[1:])]
+    except (ValueError, IndexError):
         await query.edit_message_text("❌ Invalid effect!")
         return
     
@@ -306,33 +497,116 @@ async def handle_effect_selection(update: Update, context: ContextTypes.DEFAULT_
     
     # Start processing
     await query.edit_message_text(
-        f"🎨 Effect selected: {EFFECTS[effect_id]['name']}\n"
+        f"🎨 Effect selected: {effect_data['name']}\n"
         f"⏳ Starting processing..."
     )
     
-    # Process the queue
-    asyncio.create_task(process_queue(user_id, effect_id, context, query.message.chat_id))
+    # Hand the queued files to the worker pool
+    while user_queues[user_id]:
+        queue_item = user_queues[user_id].popleft()
+        queue_item['user_id'] = user_id
+        queue_item['effect_id'] = effect_id
+        queue_item['context'] = context
+        # Prefetch now that the item is committed to processing, so later
+        # items download while earlier ones occupy the workers
+        if queue_item['file'].file_unique_id not in _samples_cache:
+            queue_item['download'] = asyncio.create_task(
+                _download_file(queue_item['file'])
+            )
+        await work_queue.put(queue_item)
 
 
-async def process_queue(user_id, effect_id, context, chat_id):
-    """Process user's queue"""
-    if user_id in processing_users:
-        return  # Already processing
-    
-    processing_users.add(user_id)
-    
-    try:
-        while user_queues[user_id]:
-            queue_item = user_queues[user_id].popleft()
-            await process_single_file(user_id, queue_item, effect_id, context, chat_id)
-    finally:
-        processing_users.discard(user_id)
+async def _worker():
+    """Pull jobs off the global work queue, one file at a time"""
+    while True:
+        queue_item = await work_queue.get()
+        try:
+            # The per-user lock keeps one user's files in upload order
+            async with user_locks[queue_item['user_id']]:
+                await process_single_file(
+                    queue_item['user_id'], queue_item, queue_item['effect_id'],
+                    queue_item['context'], queue_item['chat_id'],
+                )
+        except Exception as e:
+            logger.error(f"Worker error: {e}", exc_info=True)
+        finally:
+            work_queue.task_done()
+
+
+async def _start_workers(app):
+    """Create the work queue and worker pool on the running event loop"""
+    global work_queue
+    work_queue = asyncio.Queue(maxsize=WORK_QUEUE_SIZE)
+    for _ in range(WORKER_COUNT):
+        app.create_task(_worker())
+
+
+async def _download_file(file):
+    """Fetch an upload's bytes into memory"""
+    telegram_file = await file.get_file()
+    return await telegram_file.download_as_bytearray()
+
+
+async def _decode_audio_async(data, frame_rate=44100, channels=2):
+    """Decode compressed audio bytes to raw int16 PCM via an ffmpeg pipe"""
+    proc = await asyncio.create_subprocess_exec(
+        'ffmpeg',
+        '-i', 'pipe:0',
+        '-f', 's16le', '-ar', str(frame_rate), '-ac', str(channels), 'pipe:1',
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+    pcm, _ = await proc.communicate(bytes(data))
+    if proc.returncode != 0 or not pcm:
+        raise RuntimeError(f"ffmpeg decode failed with code {proc.returncode}")
+    return np.frombuffer(pcm, dtype=np.int16)
+
+
+async def _encode_mp3_async(raw_pcm, frame_rate, channels, output_path):
+    """Encode raw int16 PCM to MP3 by piping it straight into ffmpeg"""
+    proc = await asyncio.create_subprocess_exec(
+        'ffmpeg', '-y',
+        '-f', 's16le', '-ar', str(frame_rate), '-ac', str(channels),
+        '-i', 'pipe:0',
+        '-b:a', '192k', output_path,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+    # Feed the samples in chunks so the event loop keeps running
+    for i in range(0, len(raw_pcm), 65536):
+        proc.stdin.write(raw_pcm[i:i + 65536])
+        await proc.stdin.drain()
+    proc.stdin.close()
+
+    await proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg encode failed with code {proc.returncode}")
+
+
+def _run_effect(effect_func, samples, frame_rate, channels):
+    """Cast, apply one effect and clip back to int16 bytes in one thread hop"""
+    # Boundary cast: cached int16 -> float32 once for the whole pipeline
+    # (mono stays 1-D, halving the bytes every effect touches)
+    if channels > 1:
+        samples = samples.reshape(-1, channels)
+    buf = AudioBuf(samples.astype(np.float32) * (1.0 / 32768.0), frame_rate)
+
+    processed = effect_func(buf)
+
+    # Boundary cast: float32 -> clip -> int16 once for the encoder
+    pcm = np.clip(processed.samples * 32768.0, -32768, 32767).astype(np.int16)
+    return pcm.tobytes(), processed.frame_rate, processed.channels
 
 
 async def process_single_file(user_id, queue_item, effect_id, context, chat_id):
     """Process a single audio file"""
     file = queue_item['file']
-    
+    progress_msg = None
+
     try:
         # Send progress message
         progress_msg = await context.bot.send_message(
@@ -340,26 +614,44 @@ async def process_single_file(user_id, queue_item, effect_id, context, chat_id):
             text="⏳ Processing: 0%\n[          ]"
         )
         
-        # Download file
-        await update_progress(progress_msg, 10, "Downloading")
-        telegram_file = await file.get_file()
-        
-        input_filename = f"{TEMP_DIR}/input_{user_id}_{file.file_unique_id}.mp3"
-        output_filename = f"{TEMP_DIR}/output_{user_id}_{file.file_unique_id}.mp3"
-        
-        await telegram_file.download_to_drive(input_filename)
-        
-        # Load audio
-        await update_progress(progress_msg, 30, "Loading audio")
-        audio = AudioSegment.from_file(input_filename)
-        
-        # Apply effect
+        # Unique output path, so repeated jobs for one upload never collide
+        out_tmp = tempfile.NamedTemporaryFile(
+            prefix=f"output_{user_id}_", suffix=".mp3", dir=TEMP_DIR, delete=False
+        )
+        out_tmp.close()
+        output_filename = out_tmp.name
+
+        # Reuse the decoded samples if this upload was processed before
+        cached = _samples_cache_get(file.file_unique_id)
+        download = queue_item.get('download')
+        if cached is not None and download is not None:
+            download.cancel()  # the decoded copy is already cached
+        if cached is None:
+            # Await the prefetched bytes (the download started at upload time)
+            await update_progress(progress_msg, 10, "Downloading")
+            if download is None:
+                download = asyncio.create_task(_download_file(file))
+            data = await download
+
+            # Load audio; voice notes are mono, so skip the stereo upmix
+            await update_progress(progress_msg, 30, "Loading audio")
+            channels = 1 if queue_item.get('is_voice') else 2
+            samples = await _decode_audio_async(data, channels=channels)
+            cached = (samples, 44100, channels, 2)
+            _samples_cache_put(file.file_unique_id, cached)
+
+        samples, frame_rate, channels, sample_width = cached
+
+        # Apply effect; the boundary casts ride along in the same thread
+        # hop so the multi-hundred-MB copies stay off the event loop
         await update_progress(progress_msg, 50, f"Applying {EFFECTS[effect_id]['name']}")
-        processed_audio = EFFECTS[effect_id]['func'](audio)
-        
+        pcm, out_rate, out_channels = await asyncio.to_thread(
+            _run_effect, EFFECTS[effect_id]['func'], samples, frame_rate, channels
+        )
+
         # Export
         await update_progress(progress_msg, 80, "Exporting")
-        processed_audio.export(output_filename, format="mp3", bitrate="192k")
+        await _encode_mp3_async(pcm, out_rate, out_channels, output_filename)
         
         # Upload
         await update_progress(progress_msg, 95, "Uploading")
@@ -367,18 +659,18 @@ async def process_single_file(user_id, queue_item, effect_id, context, chat_id):
         with open(output_filename, 'rb') as audio_file:
             original_name = getattr(file, 'file_name', 'audio')
             base_name = os.path.splitext(original_name)[0]
-            new_name = f"{base_name}_{effect_id}.mp3"
+            new_name = base_name + EFFECTS[effect_id]['suffix']
             
             await context.bot.send_audio(
                 chat_id=chat_id,
                 audio=audio_file,
                 filename=new_name,
-                caption=f"✅ Effect applied: {EFFECTS[effect_id]['name']} 🎵"
+                caption=EFFECTS[effect_id]['caption']
             )
         
         # Delete progress message
         await progress_msg.delete()
-        
+
     except Exception as e:
         logger.error(f"Error processing file: {e}", exc_info=True)
         await context.bot.send_message(
@@ -386,10 +678,15 @@ async def process_single_file(user_id, queue_item, effect_id, context, chat_id):
             text="❌ Error processing audio. Please try again!"
         )
     finally:
-        # Cleanup
-        for f in [input_filename, output_filename]:
-            if os.path.exists(f):
-                os.remove(f)
+        # Cleanup (the throttle entry must go even when the job failed)
+        if progress_msg is not None:
+            _last_edit.pop(progress_msg.message_id, None)
+        if os.path.exists(output_filename):
+            os.remove(output_filename)
+
+
+# Progress-edit throttle: message_id -> (monotonic timestamp, last text sent)
+_last_edit = {}
 
 
 async def update_progress(message, percent, status):
@@ -397,11 +694,20 @@ async def update_progress(message, percent, status):
     bar_length = 10
     filled = int(bar_length * percent / 100)
     bar = "█" * filled + "░" * (bar_length - filled)
-    
+
     text = f"⏳ {status}: {percent}%\n[{bar}]"
-    
+
+    # Every edit is a Telegram API call against the bot-wide rate limit,
+    # so skip edits that repeat the last text or come within a second
+    now = time.monotonic()
+    last = _last_edit.get(message.message_id)
+    if last is not None and percent < 100:
+        if last[1] == text or now - last[0] < 1.0:
+            return
+
     try:
         await message.edit_text(text)
+        _last_edit[message.message_id] = (now, text)
     except:
         pass  # Ignore errors if message wasn't changed
 
@@ -418,16 +724,20 @@ def main():
     logger.info("Starting Advanced Audio Effects Bot...")
     
     # Create application
-    app = Application.builder().token(BOT_TOKEN).build()
+    app = Application.builder().token(BOT_TOKEN).post_init(_start_workers).build()
     
     # Add handlers
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_command))
     app.add_handler(CommandHandler("queue", queue_command))
-    app.add_handler(CallbackQueryHandler(handle_effect_selection, pattern="^effect_"))
+    # block=False lets PTB keep pulling updates while these handlers await
+    app.add_handler(CallbackQueryHandler(
+        handle_effect_selection, pattern=r"^e\d+$", block=False
+    ))
     app.add_handler(MessageHandler(
-        filters.AUDIO | filters.VOICE | filters.Document.AUDIO, 
-        handle_audio
+        filters.AUDIO | filters.VOICE | filters.Document.AUDIO,
+        handle_audio,
+        block=False
     ))
     
     # Start bot
@@ -454,119 +764,299 @@ if __name__ == "__main__":
     logger.info(f"Health server on port {port}")
     
     main()
-from collections import deque
+from collections import deque, defaultdict, OrderedDict
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, 
     CallbackQueryHandler, filters, ContextTypes
 )
 from pydub import AudioSegment
-from pydub.effects import low_pass_filter, high_pass_filter, compress_dynamic_range
-from pydub.playback import _play_with_simpleaudio
+from pydub.effects import compress_dynamic_range
+import numpy as np
+from scipy.signal import butter, sosfilt, resample_poly, oaconvolve
 
-# Setup logging
+try:
+    from numba import njit
+except ImportError:  # numba is optional; nightmare falls back to chained effects
+    njit = None
+
+# Setup logging: drop asctime from the format (strftime per record adds up
+# under load) and quiet the libraries that log every API request at INFO
 logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
+for _name in ('httpx', 'telegram', 'asyncio'):
+    logging.getLogger(_name).setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 # Configuration
 BOT_TOKEN = os.getenv("BOT_TOKEN", "8178596130:AAFttDeuEkHSFzpBzVg9zTwQbGX4Il0O5zM")
-TEMP_DIR = "temp"
+# Keep scratch files on the tmpfs RAM disk when the host has one
+TEMP_DIR = os.path.join("/dev/shm", "audio_bot") if os.path.isdir("/dev/shm") else "temp"
 MAX_QUEUE_SIZE = 10
 
 # Create temp directory
 os.makedirs(TEMP_DIR, exist_ok=True)
 
-# Queue system
+# Resolve the ffmpeg binaries once so pydub skips per-call which() lookups
+# (pydub 0.25.1 has no AudioSegment.ffprobe class attribute, so fall back
+# to the bare command name rather than reading the attribute)
+AudioSegment.converter = which('ffmpeg') or AudioSegment.converter
+AudioSegment.ffprobe = which('ffprobe') or getattr(AudioSegment, 'ffprobe', 'ffprobe')
+
+# Queue system: uploads wait in per-user deques until an effect is chosen,
+# then flow through one bounded global queue drained by a fixed worker pool
 user_queues = {}
-processing_users = set()
+WORKER_COUNT = os.cpu_count() or 2
+WORK_QUEUE_SIZE = 256
+work_queue = None  # created by _start_workers once the event loop runs
+user_locks = defaultdict(asyncio.Lock)
+
+# Decoded-audio cache: file_unique_id -> (samples, frame_rate, channels, sample_width)
+# Skips the ffmpeg decode when the same upload is processed again. Decoded
+# PCM is roughly 10x the compressed upload (a 20MB MP3 is ~200MB of
+# samples), so the cache is bounded by total bytes rather than entry count.
+SAMPLES_CACHE_BYTES = 256 * 1024 * 1024
+_samples_cache = OrderedDict()
+_samples_cache_used = 0
+
+
+def _samples_cache_get(unique_id):
+    """Return a cached decode result and mark it most recently used"""
+    entry = _samples_cache.get(unique_id)
+    if entry is not None:
+        _samples_cache.move_to_end(unique_id)
+    return entry
+
+
+def _samples_cache_put(unique_id, entry):
+    """Store a decode result, evicting least recently used past the budget"""
+    global _samples_cache_used
+    # Concurrent misses can decode the same upload twice; don't count the
+    # overwritten entry's bytes forever
+    previous = _samples_cache.get(unique_id)
+    if previous is not None:
+        _samples_cache_used -= previous[0].nbytes
+    _samples_cache[unique_id] = entry
+    _samples_cache_used += entry[0].nbytes
+    while _samples_cache_used > SAMPLES_CACHE_BYTES and len(_samples_cache) > 1:
+        _, evicted = _samples_cache.popitem(last=False)
+        _samples_cache_used -= evicted[0].nbytes
+
+
+class AudioBuf:
+    """Decoded audio as float32 samples in [-1, 1), shape (frames, channels)"""
+    __slots__ = ('samples', 'frame_rate')
+
+    def __init__(self, samples, frame_rate):
+        self.samples = samples
+        self.frame_rate = frame_rate
+
+    @property
+    def channels(self):
+        return self.samples.shape[1] if self.samples.ndim == 2 else 1
+
+
+def _gain(db):
+    """dB -> linear amplitude factor"""
+    return 10.0 ** (db / 20.0)
+
+
+def _to_buf(audio):
+    """The one int16 -> float32 cast at the start of an effect pipeline"""
+    samples = np.frombuffer(audio.raw_data, dtype=np.int16)
+    if audio.channels > 1:
+        samples = samples.reshape(-1, audio.channels)
+    return AudioBuf(samples.astype(np.float32) * (1.0 / 32768.0), audio.frame_rate)
+
+
+def _from_buf(buf):
+    """The one float32 -> clip -> int16 cast at the end of an effect pipeline"""
+    samples = np.clip(buf.samples * 32768.0, -32768, 32767).astype(np.int16)
+    return AudioSegment(
+        data=samples.tobytes(),
+        sample_width=2,
+        frame_rate=buf.frame_rate,
+        channels=buf.channels,
+    )
+
+
+# Reverb tap schedule: delays in ms plus linear gains, computed once at
+# import instead of re-deriving the dB -> amplitude factor per call
+_REVERB_DELAYS = (50, 100, 150, 200, 250)
+_REVERB_DECAYS = (0.3, 0.25, 0.2, 0.15, 0.1)
+_REVERB_GAINS = tuple(_gain(-20.0 / decay) for decay in _REVERB_DECAYS)
+
+
+@lru_cache(maxsize=8)
+def _build_reverb_ir(frame_rate):
+    """Sparse impulse response: the dry tap plus the five decayed echoes"""
+    h = np.zeros(int(_REVERB_DELAYS[-1] * frame_rate / 1000) + 1, dtype=np.float32)
+    h[0] = 1.0
+    for delay, gain in zip(_REVERB_DELAYS, _REVERB_GAINS):
+        h[int(delay * frame_rate / 1000)] += gain
+    return h
+
+
+@lru_cache(maxsize=None)
+def _design_sos(frame_rate, cutoff, btype):
+    """Design a 4th-order Butterworth filter once per (rate, cutoff, type)"""
+    return butter(4, cutoff, btype, fs=frame_rate, output='sos')
+
+
+@lru_cache(maxsize=64)
+def _resample_fraction(rate_ratio):
+    """Reduce a resample ratio to small integer up/down factors once"""
+    ratio = Fraction(rate_ratio).limit_denominator(1000)
+    return ratio.numerator, ratio.denominator
+
+
+def _nightmare_kernel(samples, frame_rate, channels):
+    """Fused pitch-down + slow-down + reverb pass over one float32 buffer"""
+    # Combined resample ratio: 0.7x speed on top of a -5 semitone shift
+    ratio = 0.7 * 2.0 ** (-5.0 / 12.0)
+    frames = samples.shape[0] // channels
+    out_frames = int(frames / ratio)
+    out = np.zeros(out_frames * channels, dtype=np.float32)
+
+    # Linear-interpolation resample at the combined ratio
+    for i in range(out_frames):
+        pos = i * ratio
+        i0 = int(pos)
+        frac = pos - i0
+        i1 = i0 + 1
+        if i1 >= frames:
+            i1 = frames - 1
+        for c in range(channels):
+            a = samples[i0 * channels + c]
+            b = samples[i1 * channels + c]
+            out[i * channels + c] = a + (b - a) * frac
+
+    # 5-tap comb reverb added in place over the resampled buffer
+    delays = (50, 100, 150, 200, 250)
+    decays = (0.3, 0.25, 0.2, 0.15, 0.1)
+    dry = out.copy()
+    for t in range(5):
+        offset = (delays[t] * frame_rate // 1000) * channels
+        gain = 10.0 ** (-(20.0 / decays[t]) / 20.0)
+        for j in range(offset, out.shape[0]):
+            out[j] += dry[j - offset] * gain
+
+    # Final -3 dB trim (clipping happens once at the int16 export boundary)
+    trim = 10.0 ** (-3.0 / 20.0)
+    for j in range(out.shape[0]):
+        out[j] *= trim
+    return out
+
+
+if njit is not None:
+    _nightmare_kernel = njit(cache=True, fastmath=True)(_nightmare_kernel)
 
 
 class AudioEffects:
-    """Collection of audio effects"""
-    
+    """Collection of audio effects (all take and return an AudioBuf)"""
+
+    @staticmethod
+    def _apply_sos(buf, sos):
+        """Run a cascaded-sections filter over the samples (vectorized)"""
+        y = sosfilt(sos, buf.samples, axis=0).astype(np.float32)
+        return AudioBuf(y, buf.frame_rate)
+
     @staticmethod
-    def muffled(audio, intensity="medium"):
+    def muffled(buf, intensity="medium"):
         """Make audio sound muffled (through a wall)"""
         cutoffs = {"light": 1500, "medium": 800, "heavy": 400}
         cutoff = cutoffs.get(intensity, 800)
-        muffled = low_pass_filter(audio, cutoff)
-        return muffled - 3  # Reduce volume slightly
-    
+        muffled = AudioEffects._apply_sos(
+            buf, _design_sos(buf.frame_rate, cutoff, 'lowpass')
+        )
+        muffled.samples *= _gain(-3)  # Reduce volume slightly
+        return muffled
+
     @staticmethod
-    def underwater(audio):
+    def underwater(buf):
         """Underwater effect with bubbling sound"""
         # Heavy low-pass + volume modulation
-        underwater = low_pass_filter(audio, 300)
-        underwater = underwater - 6  # Quieter
+        underwater = AudioEffects._apply_sos(
+            buf, _design_sos(buf.frame_rate, 300, 'lowpass')
+        )
+        underwater.samples *= _gain(-6)  # Quieter
         # Add slight wobble (frequency modulation simulation)
         return underwater
-    
+
     @staticmethod
-    def phone(audio):
+    def phone(buf):
         """Old telephone/radio effect"""
         # Bandpass filter (remove low and high frequencies)
-        phone = high_pass_filter(audio, 300)
-        phone = low_pass_filter(phone, 3000)
-        # Add compression
-        phone = compress_dynamic_range(phone)
-        return phone - 2
+        phone = AudioEffects._apply_sos(
+            buf, _design_sos(buf.frame_rate, 300, 'highpass')
+        )
+        phone = AudioEffects._apply_sos(
+            phone, _design_sos(buf.frame_rate, 3000, 'lowpass')
+        )
+        # Add compression (pydub-based, so round-trip at that boundary)
+        phone = _to_buf(compress_dynamic_range(_from_buf(phone)))
+        phone.samples *= _gain(-2)
+        return phone
     
     @staticmethod
-    def echo(audio, delay_ms=300, decay=0.5):
+    def echo(buf, delay_ms=300, decay=0.5):
         """Add echo effect"""
-        # Create delayed copy
-        silence = AudioSegment.silent(duration=delay_ms)
-        delayed = silence + audio
-        # Mix with original
-        echo_audio = audio.overlay(delayed - (20 * (1 - decay)))
-        return echo_audio
-    
+        samples = buf.samples
+        out = samples.copy()
+
+        # Mix a delayed, attenuated copy back in (vectorized, no overlay)
+        offset = int(delay_ms * buf.frame_rate / 1000)
+        if offset < len(samples):
+            out[offset:] += samples[:len(samples) - offset] * _gain(-20 * (1 - decay))
+
+        return AudioBuf(out, buf.frame_rate)
+
     @staticmethod
-    def reverb(audio):
-        """Simple reverb effect using multiple echoes"""
-        reverb_audio = audio
-        delays = [50, 100, 150, 200, 250]
-        decays = [0.3, 0.25, 0.2, 0.15, 0.1]
-        
-        for delay, decay in zip(delays, decays):
-            silence = AudioSegment.silent(duration=delay)
-            delayed = silence + audio
-            reverb_audio = reverb_audio.overlay(delayed - (20 / decay))
-        
-        return reverb_audio
+    def reverb(buf):
+        """Reverb as one FFT convolution with the cached impulse response"""
+        h = _build_reverb_ir(buf.frame_rate)
+        if buf.samples.ndim == 2:
+            h = h[:, np.newaxis]
+        y = oaconvolve(buf.samples, h, mode='full', axes=0)[:len(buf.samples)]
+        return AudioBuf(y.astype(np.float32), buf.frame_rate)
     
     @staticmethod
-    def speed_change(audio, speed=1.5):
+    def _resample(buf, rate_ratio):
+        """Resample as if recorded at frame_rate * rate_ratio (polyphase FIR)"""
+        up, down = _resample_fraction(rate_ratio)
+        # Snapping back to the original rate inverts the ratio
+        y = resample_poly(buf.samples, down, up, axis=0).astype(np.float32)
+        return AudioBuf(y, buf.frame_rate)
+
+    @staticmethod
+    def speed_change(buf, speed=1.5):
         """Change playback speed"""
-        # Change frame rate to alter speed
-        sound_with_altered_frame_rate = audio._spawn(
-            audio.raw_data, 
-            overrides={"frame_rate": int(audio.frame_rate * speed)}
-        )
-        return sound_with_altered_frame_rate.set_frame_rate(audio.frame_rate)
-    
+        return AudioEffects._resample(buf, speed)
+
     @staticmethod
-    def pitch_shift(audio, semitones=2):
+    def pitch_shift(buf, semitones=2):
         """Shift pitch up or down"""
-        # Change pitch by altering sample rate
-        new_sample_rate = int(audio.frame_rate * (2.0 ** (semitones / 12.0)))
-        pitched = audio._spawn(
-            audio.raw_data,
-            overrides={'frame_rate': new_sample_rate}
-        )
-        return pitched.set_frame_rate(audio.frame_rate)
+        return AudioEffects._resample(buf, 2.0 ** (semitones / 12.0))
     
     @staticmethod
-    def nightmare(audio):
+    def nightmare(buf):
         """Creepy nightmare effect"""
-        # Combine: pitch down + reverb + slow down
-        nightmare = AudioEffects.pitch_shift(audio, -5)
-        nightmare = AudioEffects.speed_change(nightmare, 0.7)
-        nightmare = AudioEffects.reverb(nightmare)
-        return nightmare - 3
+        if njit is None:
+            # Combine: pitch down + reverb + slow down
+            nightmare = AudioEffects.pitch_shift(buf, -5)
+            nightmare = AudioEffects.speed_change(nightmare, 0.7)
+            nightmare = AudioEffects.reverb(nightmare)
+            nightmare.samples *= _gain(-3)
+            return nightmare
+
+        # One jitted pass: resample, reverb and trim in a single buffer
+        channels = buf.channels
+        out = _nightmare_kernel(buf.samples.reshape(-1), buf.frame_rate, channels)
+        if channels > 1:
+            out = out.reshape(-1, channels)
+        return AudioBuf(out, buf.frame_rate)
 
 
 # Effect presets
@@ -585,25 +1075,30 @@ EFFECTS = {
     "nightmare": {"name": "👻 Nightmare Mode", "func": AudioEffects.nightmare},
 }
 
+# Pre-bake the per-effect strings used on every send, once at import
+for _effect_id, _effect_data in EFFECTS.items():
+    _effect_data['caption'] = f"✅ Effect applied: {_effect_data['name']} 🎵"
+    _effect_data['suffix'] = f"_{_effect_id}.mp3"
+
+
+# Dispatch table: callback_data carries the index into this tuple ("e0".."e11"),
+# so the handler does one int() parse and a tuple lookup per button press
+EFFECTS_BY_IDX = tuple(EFFECTS.items())
+
+# The keyboard is a pure function of EFFECTS, so build it once at import
+# (rows of 2 buttons each) and hand out the same immutable markup object
+EFFECTS_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton(EFFECTS_BY_IDX[idx][1]["name"], callback_data=f"e{idx}")
+        for idx in range(i, min(i + 2, len(EFFECTS_BY_IDX)))
+    ]
+    for i in range(0, len(EFFECTS_BY_IDX), 2)
+])
+
 
 def get_effects_keyboard():
-    """Create inline keyboard for effect selection"""
-    keyboard = []
-    effects_list = list(EFFECTS.items())
-    
-    # Create rows of 2 buttons each
-    for i in range(0, len(effects_list), 2):
-        row = []
-        for j in range(2):
-            if i + j < len(effects_list):
-                effect_id, effect_data = effects_list[i + j]
-                row.append(InlineKeyboardButton(
-                    effect_data["name"], 
-                    callback_data=f"effect_{effect_id}"
-                ))
-        keyboard.append(row)
-    
-    return InlineKeyboardMarkup(keyboard)
+    """Return the prebuilt inline keyboard for effect selection"""
+    return EFFECTS_KEYBOARD
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -665,7 +1160,7 @@ async def queue_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     queue_size = len(user_queues[user_id])
-    is_processing = user_id in processing_users
+    is_processing = user_locks[user_id].locked()
     
     status = "🔄 *Processing*" if is_processing else "⏸️ *Waiting*"
     message = (
@@ -713,6 +1208,7 @@ async def handle_audio(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Add to queue
         queue_item = {
             'file': file,
+            'is_voice': update.message.voice is not None,
             'message_id': update.message.message_id,
             'chat_id': update.effective_chat.id,
             'timestamp': datetime.now()
@@ -741,9 +1237,9 @@ async def handle_effect_selection(update: Update, context: ContextTypes.DEFAULT_
     await query.answer()
     
     user_id = update.effective_user.id
-    effect_id = query.data.replace("effect_", "")
-    
-    if effect_id not in EFFECTS:
+    try:
+        effect_id, effect_data = EFFECTS_BY_IDX[int(query.data[1:])]
+    except (ValueError, IndexError):
         await query.edit_message_text("❌ Invalid effect!")
         return
     
@@ -754,33 +1250,116 @@ async def handle_effect_selection(update: Update, context: ContextTypes.DEFAULT_
     
     # Start processing
     await query.edit_message_text(
-        f"🎨 Effect selected: {EFFECTS[effect_id]['name']}\n"
+        f"🎨 Effect selected: {effect_data['name']}\n"
         f"⏳ Starting processing..."
     )
     
-    # Process the queue
-    asyncio.create_task(process_queue(user_id, effect_id, context, query.message.chat_id))
+    # Hand the queued files to the worker pool
+    while user_queues[user_id]:
+        queue_item = user_queues[user_id].popleft()
+        queue_item['user_id'] = user_id
+        queue_item['effect_id'] = effect_id
+        queue_item['context'] = context
+        # Prefetch now that the item is committed to processing, so later
+        # items download while earlier ones occupy the workers
+        if queue_item['file'].file_unique_id not in _samples_cache:
+            queue_item['download'] = asyncio.create_task(
+                _download_file(queue_item['file'])
+            )
+        await work_queue.put(queue_item)
 
 
-async def process_queue(user_id, effect_id, context, chat_id):
-    """Process user's queue"""
-    if user_id in processing_users:
-        return  # Already processing
-    
-    processing_users.add(user_id)
-    
-    try:
-        while user_queues[user_id]:
-            queue_item = user_queues[user_id].popleft()
-            await process_single_file(user_id, queue_item, effect_id, context, chat_id)
-    finally:
-        processing_users.discard(user_id)
+async def _worker():
+    """Pull jobs off the global work queue, one file at a time"""
+    while True:
+        queue_item = await work_queue.get()
+        try:
+            # The per-user lock keeps one user's files in upload order
+            async with user_locks[queue_item['user_id']]:
+                await process_single_file(
+                    queue_item['user_id'], queue_item, queue_item['effect_id'],
+                    queue_item['context'], queue_item['chat_id'],
+                )
+        except Exception as e:
+            logger.error(f"Worker error: {e}", exc_info=True)
+        finally:
+            work_queue.task_done()
+
+
+async def _start_workers(app):
+    """Create the work queue and worker pool on the running event loop"""
+    global work_queue
+    work_queue = asyncio.Queue(maxsize=WORK_QUEUE_SIZE)
+    for _ in range(WORKER_COUNT):
+        app.create_task(_worker())
+
+
+async def _download_file(file):
+    """Fetch an upload's bytes into memory"""
+    telegram_file = await file.get_file()
+    return await telegram_file.download_as_bytearray()
+
+
+async def _decode_audio_async(data, frame_rate=44100, channels=2):
+    """Decode compressed audio bytes to raw int16 PCM via an ffmpeg pipe"""
+    proc = await asyncio.create_subprocess_exec(
+        'ffmpeg',
+        '-i', 'pipe:0',
+        '-f', 's16le', '-ar', str(frame_rate), '-ac', str(channels), 'pipe:1',
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+    pcm, _ = await proc.communicate(bytes(data))
+    if proc.returncode != 0 or not pcm:
+        raise RuntimeError(f"ffmpeg decode failed with code {proc.returncode}")
+    return np.frombuffer(pcm, dtype=np.int16)
+
+
+async def _encode_mp3_async(raw_pcm, frame_rate, channels, output_path):
+    """Encode raw int16 PCM to MP3 by piping it straight into ffmpeg"""
+    proc = await asyncio.create_subprocess_exec(
+        'ffmpeg', '-y',
+        '-f', 's16le', '-ar', str(frame_rate), '-ac', str(channels),
+        '-i', 'pipe:0',
+        '-b:a', '192k', output_path,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+    # Feed the samples in chunks so the event loop keeps running
+    for i in range(0, len(raw_pcm), 65536):
+        proc.stdin.write(raw_pcm[i:i + 65536])
+        await proc.stdin.drain()
+    proc.stdin.close()
+
+    await proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg encode failed with code {proc.returncode}")
+
+
+def _run_effect(effect_func, samples, frame_rate, channels):
+    """Cast, apply one effect and clip back to int16 bytes in one thread hop"""
+    # Boundary cast: cached int16 -> float32 once for the whole pipeline
+    # (mono stays 1-D, halving the bytes every effect touches)
+    if channels > 1:
+        samples = samples.reshape(-1, channels)
+    buf = AudioBuf(samples.astype(np.float32) * (1.0 / 32768.0), frame_rate)
+
+    processed = effect_func(buf)
+
+    # Boundary cast: float32 -> clip -> int16 once for the encoder
+    pcm = np.clip(processed.samples * 32768.0, -32768, 32767).astype(np.int16)
+    return pcm.tobytes(), processed.frame_rate, processed.channels
 
 
 async def process_single_file(user_id, queue_item, effect_id, context, chat_id):
     """Process a single audio file"""
     file = queue_item['file']
-    
+    progress_msg = None
+
     try:
         # Send progress message
         progress_msg = await context.bot.send_message(
@@ -788,26 +1367,44 @@ async def process_single_file(user_id, queue_item, effect_id, context, chat_id):
             text="⏳ Processing: 0%\n[          ]"
         )
         
-        # Download file
-        await update_progress(progress_msg, 10, "Downloading")
-        telegram_file = await file.get_file()
-        
-        input_filename = f"{TEMP_DIR}/input_{user_id}_{file.file_unique_id}.mp3"
-        output_filename = f"{TEMP_DIR}/output_{user_id}_{file.file_unique_id}.mp3"
-        
-        await telegram_file.download_to_drive(input_filename)
-        
-        # Load audio
-        await update_progress(progress_msg, 30, "Loading audio")
-        audio = AudioSegment.from_file(input_filename)
-        
-        # Apply effect
+        # Unique output path, so repeated jobs for one upload never collide
+        out_tmp = tempfile.NamedTemporaryFile(
+            prefix=f"output_{user_id}_", suffix=".mp3", dir=TEMP_DIR, delete=False
+        )
+        out_tmp.close()
+        output_filename = out_tmp.name
+
+        # Reuse the decoded samples if this upload was processed before
+        cached = _samples_cache_get(file.file_unique_id)
+        download = queue_item.get('download')
+        if cached is not None and download is not None:
+            download.cancel()  # the decoded copy is already cached
+        if cached is None:
+            # Await the prefetched bytes (the download started at upload time)
+            await update_progress(progress_msg, 10, "Downloading")
+            if download is None:
+                download = asyncio.create_task(_download_file(file))
+            data = await download
+
+            # Load audio; voice notes are mono, so skip the stereo upmix
+            await update_progress(progress_msg, 30, "Loading audio")
+            channels = 1 if queue_item.get('is_voice') else 2
+            samples = await _decode_audio_async(data, channels=channels)
+            cached = (samples, 44100, channels, 2)
+            _samples_cache_put(file.file_unique_id, cached)
+
+        samples, frame_rate, channels, sample_width = cached
+
+        # Apply effect; the boundary casts ride along in the same thread
+        # hop so the multi-hundred-MB copies stay off the event loop
         await update_progress(progress_msg, 50, f"Applying {EFFECTS[effect_id]['name']}")
-        processed_audio = EFFECTS[effect_id]['func'](audio)
-        
+        pcm, out_rate, out_channels = await asyncio.to_thread(
+            _run_effect, EFFECTS[effect_id]['func'], samples, frame_rate, channels
+        )
+
         # Export
         await update_progress(progress_msg, 80, "Exporting")
-        processed_audio.export(output_filename, format="mp3", bitrate="192k")
+        await _encode_mp3_async(pcm, out_rate, out_channels, output_filename)
         
         # Upload
         await update_progress(progress_msg, 95, "Uploading")
@@ -815,18 +1412,18 @@ async def process_single_file(user_id, queue_item, effect_id, context, chat_id):
         with open(output_filename, 'rb') as audio_file:
             original_name = getattr(file, 'file_name', 'audio')
             base_name = os.path.splitext(original_name)[0]
-            new_name = f"{base_name}_{effect_id}.mp3"
+            new_name = base_name + EFFECTS[effect_id]['suffix']
             
             await context.bot.send_audio(
                 chat_id=chat_id,
                 audio=audio_file,
                 filename=new_name,
-                caption=f"✅ Effect applied: {EFFECTS[effect_id]['name']} 🎵"
+                caption=EFFECTS[effect_id]['caption']
             )
         
         # Delete progress message
         await progress_msg.delete()
-        
+
     except Exception as e:
         logger.error(f"Error processing file: {e}", exc_info=True)
         await context.bot.send_message(
@@ -834,10 +1431,15 @@ async def process_single_file(user_id, queue_item, effect_id, context, chat_id):
             text="❌ Error processing audio. Please try again!"
         )
     finally:
-        # Cleanup
-        for f in [input_filename, output_filename]:
-            if os.path.exists(f):
-                os.remove(f)
+        # Cleanup (the throttle entry must go even when the job failed)
+        if progress_msg is not None:
+            _last_edit.pop(progress_msg.message_id, None)
+        if os.path.exists(output_filename):
+            os.remove(output_filename)
+
+
+# Progress-edit throttle: message_id -> (monotonic timestamp, last text sent)
+_last_edit = {}
 
 
 async def update_progress(message, percent, status):
@@ -845,11 +1447,20 @@ async def update_progress(message, percent, status):
     bar_length = 10
     filled = int(bar_length * percent / 100)
     bar = "█" * filled + "░" * (bar_length - filled)
-    
+
     text = f"⏳ {status}: {percent}%\n[{bar}]"
-    
+
+    # Every edit is a Telegram API call against the bot-wide rate limit,
+    # so skip edits that repeat the last text or come within a second
+    now = time.monotonic()
+    last = _last_edit.get(message.message_id)
+    if last is not None and percent < 100:
+        if last[1] == text or now - last[0] < 1.0:
+            return
+
     try:
         await message.edit_text(text)
+        _last_edit[message.message_id] = (now, text)
     except:
         pass  # Ignore errors if message wasn't changed
 
@@ -866,16 +1477,20 @@ def main():
     logger.info("Starting Advanced Audio Effects Bot...")
     
     # Create application
-    app = Application.builder().token(BOT_TOKEN).build()
+    app = Application.builder().token(BOT_TOKEN).post_init(_start_workers).build()
     
     # Add handlers
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_command))
     app.add_handler(CommandHandler("queue", queue_command))
-    app.add_handler(CallbackQueryHandler(handle_effect_selection, pattern="^effect_"))
+    # block=False lets PTB keep pulling updates while these handlers await
+    app.add_handler(CallbackQueryHandler(
+        handle_effect_selection, pattern=r"^e\d+$", block=False
+    ))
     app.add_handler(MessageHandler(
-        filters.AUDIO | filters.VOICE | filters.Document.AUDIO, 
-        handle_audio
+        filters.AUDIO | filters.VOICE | filters.Document.AUDIO,
+        handle_audio,
+        block=False
     ))
     
     # Start bot